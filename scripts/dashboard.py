@@ -1,24 +1,74 @@
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from neo4j import GraphDatabase
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from degree_utils import top_k_indices
 
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 REPORTS_DIR = os.path.join(PROJECT_ROOT, "reports")
+STATS_PATH = os.path.join(REPORTS_DIR, "stats.json")
+DEGREE_CACHE_PATH = os.path.join(REPORTS_DIR, "degree_cache.parquet")
 
 # Neo4j connection
 URI = "bolt://localhost:7687"
 AUTH = ("neo4j", "password123")
+POOL_SIZE = 4
+
+driver = GraphDatabase.driver(
+    URI,
+    auth=AUTH,
+    max_connection_pool_size=POOL_SIZE,
+    connection_acquisition_timeout=30
+)
 
-driver = GraphDatabase.driver(URI, auth=AUTH)
+def run_scalar(query):
+    # Sessions are not thread-safe, so each call gets its own
+    with driver.session() as session:
+        return session.execute_read(lambda tx: tx.run(query).single().value())
+
+def run_scalars(queries):
+    # Run independent single-value queries (e.g. counts) concurrently,
+    # never more at once than the driver's connection pool allows
+    with ThreadPoolExecutor(max_workers=min(len(queries), POOL_SIZE)) as executor:
+        return list(executor.map(run_scalar, queries))
 
-def run_query(query):
+def run_df(query):
+    # Build the DataFrame straight from the result, without a dict per record
     with driver.session() as session:
-        result = session.run(query)
-        return [record.data() for record in result]
+        return session.execute_read(lambda tx: tx.run(query).to_df())
+
+def load_stats(total_intersections, total_roads):
+    # Degree aggregates precomputed by parse_data.py, if they match the database
+    if not os.path.exists(STATS_PATH):
+        return None
+    with open(STATS_PATH) as f:
+        stats = json.load(f)
+    if (stats['total_intersections'], stats['total_roads']) != (total_intersections, total_roads):
+        return None
+    return stats
+
+def load_cached_degrees(signature):
+    # Per-node degrees from an earlier live fetch, if the graph is unchanged
+    if not os.path.exists(DEGREE_CACHE_PATH):
+        return None
+    metadata = pq.read_schema(DEGREE_CACHE_PATH).metadata or {}
+    if metadata.get(b'signature') != signature.encode():
+        return None
+    return pd.read_parquet(DEGREE_CACHE_PATH)
+
+def save_cached_degrees(nodes_df, signature):
+    table = pa.Table.from_pandas(nodes_df, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), b'signature': signature.encode()}
+    pq.write_table(table.replace_schema_metadata(metadata), DEGREE_CACHE_PATH)
 
 print("=" * 50)
 print("US ROAD NETWORK DASHBOARD")
@@ -27,49 +77,64 @@ print("=" * 50)
 # ============================================
 # FETCH ALL DATA
 # ============================================
-print("\n[1/4] Fetching total intersections and roads...")
-total_intersections = run_query("MATCH (i:Intersection) RETURN count(i) AS total")[0]['total']
-total_roads = run_query("MATCH ()-[r:ROAD]->() RETURN count(r) AS total")[0]['total']
+intersections_query = "MATCH (i:Intersection) RETURN count(i) AS total"
+roads_query = "MATCH ()-[r:ROAD]->() RETURN count(r) AS total"
+# Only used when stats.json no longer matches the database, i.e. the graph
+# changed after import, so the stored i.degree may be stale or missing:
+# count each intersection's roads live instead
+degree_query = """
+MATCH (i:Intersection)
+RETURN i.id AS intersection_id, COUNT { (i)-[:ROAD]-() } AS degree
+"""
+
+print("\n[1/3] Fetching total intersections and roads...")
+total_intersections, total_roads = run_scalars([intersections_query, roads_query])
 avg_degree = round((2 * total_roads) / total_intersections, 2)
 
 print(f"   Total Intersections: {total_intersections:,}")
 print(f"   Total Roads: {total_roads:,}")
 
-print("\n[2/4] Fetching degree distribution...")
-degree_query = """
-MATCH (i:Intersection)
-WITH i, COUNT { (i)-[:ROAD]-() } AS degree
-RETURN degree, count(*) AS count
-ORDER BY degree
-"""
-degree_df = pd.DataFrame(run_query(degree_query))
+print("\n[2/3] Loading degree distribution and top 10 intersections...")
+stats = load_stats(total_intersections, total_roads)
 
-print("\n[3/4] Fetching top 10 most connected intersections...")
-top10_query = """
-MATCH (i:Intersection)
-WITH i, COUNT { (i)-[:ROAD]-() } AS degree
-RETURN i.id AS intersection_id, degree
-ORDER BY degree DESC
-LIMIT 10
-"""
-top10_df = pd.DataFrame(run_query(top10_query))
+if stats is not None:
+    degree_df = pd.DataFrame(stats['degree_distribution'])
+    top10 = stats['top10']
+else:
+    # stats.json is missing or was built from different data: use the
+    # cached live result for this graph, or compute it from Neo4j
+    signature = f"live:{total_intersections}:{total_roads}"
+    nodes_df = load_cached_degrees(signature)
+    if nodes_df is None:
+        print("   stats.json missing or stale, computing from Neo4j...")
+        nodes_df = run_df(degree_query)
+        save_cached_degrees(nodes_df, signature)
+    else:
+        print(f"   Using cached degrees from {DEGREE_CACHE_PATH}")
+    degree_df = (
+        nodes_df['degree'].value_counts()
+        .sort_index()
+        .rename_axis('degree')
+        .reset_index(name='count')
+    )
+    # Linear-time top 10 selection, same as parse_data.py uses for stats.json
+    top = top_k_indices(nodes_df['degree'].to_numpy(), 10)
+    top10 = nodes_df.iloc[top].to_dict('records')
 
-print("\n[4/4] Fetching intersection categories...")
-categories_query = """
-MATCH (i:Intersection)
-WITH i, COUNT { (i)-[:ROAD]-() } AS degree
-RETURN 
-    CASE 
-        WHEN degree = 1 THEN 'Dead End (1 road)'
-        WHEN degree = 2 THEN 'Pass Through (2 roads)'
-        WHEN degree = 3 THEN 'T-Junction (3 roads)'
-        WHEN degree = 4 THEN 'Crossroad (4 roads)'
-        ELSE 'Major Hub (5+ roads)'
-    END AS category,
-    count(*) AS count
-ORDER BY count DESC
-"""
-categories_df = pd.DataFrame(run_query(categories_query))
+print("\n[3/3] Computing intersection categories...")
+category_labels = [
+    'Isolated (0 roads)',
+    'Dead End (1 road)',
+    'Pass Through (2 roads)',
+    'T-Junction (3 roads)',
+    'Crossroad (4 roads)',
+    'Major Hub (5+ roads)'
+]
+# Right-closed bins; the -1 edge keeps degree 0 in its own bucket
+category_bins = pd.cut(degree_df['degree'], bins=[-1, 0, 1, 2, 3, 4, np.inf], labels=category_labels)
+category_counts = degree_df.groupby(category_bins, observed=True)['count'].sum()
+# (category, count) pairs, most common first
+categories = sorted(category_counts.items(), key=lambda item: item[1], reverse=True)
 
 # ============================================
 #  DASHBOARD
@@ -103,14 +168,14 @@ degree_colors = {
     5: '#F39C12',  # Orange - Major hub
     6: '#E67E22'   # Dark orange - Major hub
 }
-colors = [degree_colors.get(d, '#95A5A6') for d in degree_df['degree']]
+colors = pd.Series(degree_colors).reindex(degree_df['degree']).fillna('#95A5A6').to_numpy()
 
 fig.add_trace(
     go.Bar(
         x=degree_df['degree'],
         y=degree_df['count'],
         marker_color=colors,
-        text=degree_df['count'].apply(lambda x: f'{x:,}'),
+        texttemplate='%{y:,}',
         textposition='outside',
         textfont=dict(size=12, color='#2C3E50'),
         hovertemplate='<b>Degree %{x}</b><br>Count: %{y:,}<extra></extra>'
@@ -121,15 +186,16 @@ fig.add_trace(
 # ============================================
 # CHART 2: Top 10 Intersections (Horizontal Bar)
 # ============================================
-top10_sorted = top10_df.sort_values('degree', ascending=True)
+top10_sorted = sorted(top10, key=lambda row: row['degree'])
+top10_degrees = [row['degree'] for row in top10_sorted]
 
 fig.add_trace(
     go.Bar(
-        y=top10_sorted['intersection_id'].astype(str),
-        x=top10_sorted['degree'],
+        y=[str(row['intersection_id']) for row in top10_sorted],
+        x=top10_degrees,
         orientation='h',
         marker_color='#3498DB',
-        text=top10_sorted['degree'],
+        text=top10_degrees,
         textposition='outside',
         textfont=dict(size=12, color='#2C3E50'),
         hovertemplate='<b>Intersection %{y}</b><br>Degree: %{x}<extra></extra>'
@@ -140,16 +206,16 @@ fig.add_trace(
 # ============================================
 # CHART 3: Intersection Types (Horizontal Bar)
 # ============================================
-category_colors = ['#3498DB', '#2ECC71', '#9B59B6', '#E74C3C', '#F39C12']
-categories_sorted = categories_df.sort_values('count', ascending=True)
+category_colors = ['#3498DB', '#2ECC71', '#9B59B6', '#E74C3C', '#F39C12', '#95A5A6']
+categories_sorted = categories[::-1]
 
 fig.add_trace(
     go.Bar(
-        y=categories_sorted['category'],
-        x=categories_sorted['count'],
+        y=[category for category, _ in categories_sorted],
+        x=[count for _, count in categories_sorted],
         orientation='h',
         marker_color=category_colors,
-        text=categories_sorted['count'].apply(lambda x: f'{x:,}'),
+        texttemplate='%{x:,}',
         textposition='outside',
         textfont=dict(size=12, color='#2C3E50'),
         hovertemplate='<b>%{y}</b><br>Count: %{x:,}<extra></extra>'
@@ -160,8 +226,8 @@ fig.add_trace(
 # ============================================
 # CHART 4: Key Insights Table
 # ============================================
-most_common_type = categories_df.loc[categories_df['count'].idxmax(), 'category']
-most_common_pct = round(categories_df['count'].max() / total_intersections * 100, 1)
+most_common_type, most_common_count = categories[0] if categories else ('None', 0)
+most_common_pct = round(most_common_count / total_intersections * 100, 1) if total_intersections else 0.0
 
 insights_data = [
     ['📍 Total Intersections', f'{total_intersections:,}'],
@@ -232,7 +298,14 @@ fig.update_yaxes(title_text="", row=2, col=1, tickfont=dict(size=11))
 # SAVE AND SHOW
 # ============================================
 output_path = os.path.join(REPORTS_DIR, "dashboard.html")
-fig.write_html(output_path)
+# Load plotly.js from the CDN instead of inlining the ~3.5 MB bundle
+fig.write_html(
+    output_path,
+    include_plotlyjs='cdn',
+    include_mathjax=False,
+    full_html=True,
+    config={'responsive': True}
+)
 print(f"\n  Dashboard saved to: {output_path}")
 
 fig.show()
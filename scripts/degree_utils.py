@@ -0,0 +1,13 @@
+import numpy as np
+
+def top_k_indices(values, k=10):
+    # Indices of the k largest values, largest first; linear-time selection
+    # instead of a full sort. Fewer than k values just returns them all.
+    k = min(k, len(values))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    if k == len(values):
+        top = np.arange(k)
+    else:
+        top = np.argpartition(-values, k - 1)[:k]
+    return top[np.argsort(-values[top], kind='stable')]
@@ -1,76 +1,140 @@
-import csv
-import math
+import json
+import warnings
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from degree_utils import top_k_indices
 
 # File paths
 INPUT_FILE = "../data/raw/usa.txt"
 INTERSECTIONS_CSV = "../docker/import/intersections.csv"
 ROADS_CSV = "../docker/import/roads.csv"
+INTERSECTIONS_PARQUET = "../docker/import/intersections.parquet"
+ROADS_PARQUET = "../docker/import/roads.parquet"
+STATS_JSON = "../reports/stats.json"
+
+# Plain header row, as Neo4j's LOAD CSV examples expect
+CSV_OPTIONS = pa_csv.WriteOptions(quoting_header='none')
+
+def write_table(table, csv_path, parquet_path):
+    # Arrow formats the CSV in multithreaded C++; Parquet keeps the typed columns
+    pa_csv.write_csv(table, csv_path, CSV_OPTIONS)
+    pq.write_table(table, parquet_path, compression='zstd')
+
+def road_distances(coords, edges):
+    # Gather both endpoints of every road in one pass, shape (E, 2, 2),
+    # widened so coordinate deltas cannot overflow int32. The gathered
+    # endpoints and deltas are freed on return, before any output is written.
+    endpoints = coords[edges].astype(np.int64)
+    dx, dy = (endpoints[:, 1] - endpoints[:, 0]).T
+    return np.round(np.hypot(dx, dy), 2)
 
 def parse_data():
     print("Reading usa.txt...")
     
-    with open(INPUT_FILE, 'r') as f:
-        lines = f.readlines()
+    # Stream the file once: header, then vertex rows, then edge rows.
+    # np.loadtxt tokenizes and converts in compiled code (NumPy >= 1.23),
+    # so no Python bytecode runs per line or per token.
+    # An empty section is valid (e.g. a graph with no roads), not worth a warning
+    with open(INPUT_FILE, 'r') as f, warnings.catch_warnings():
+        warnings.filterwarnings('ignore', 'loadtxt: input contained no data')
+        
+        # Line 1: header
+        header = f.readline().split()
+        num_vertices = int(header[0])
+        num_edges = int(header[1])
+        
+        print(f"Total intersections: {num_vertices}")
+        print(f"Total roads: {num_edges}")
+        
+        # Parse vertices (next num_vertices lines) as an (id, x, y) array
+        print("Parsing intersections...")
+        vertices = np.loadtxt(f, dtype=np.int32, max_rows=num_vertices,
+                              ndmin=2).reshape(-1, 3)
+        
+        # Parse edges (remaining lines) as a (source, target) array
+        print("Parsing roads...")
+        edges = np.loadtxt(f, dtype=np.int32, usecols=(0, 1),
+                           ndmin=2).reshape(-1, 2)
     
-    # Line 1: header
-    header = lines[0].strip().split()
-    num_vertices = int(header[0])
-    num_edges = int(header[1])
+    print(f"Parsed {len(vertices)} intersections")
+    print(f"Parsed {len(edges)} roads")
     
-    print(f"Total intersections: {num_vertices}")
-    print(f"Total roads: {num_edges}")
+    # Coordinate table indexed by vertex id
+    vertex_ids = vertices[:, 0]
+    num_ids = vertex_ids.max() + 1 if len(vertex_ids) else 0
+    coords = np.empty((num_ids, 2), dtype=np.int32)
+    coords[vertex_ids] = vertices[:, 1:3]
     
-    # Parse vertices (lines 2 to num_vertices + 1)
-    vertices = {}
-    print("Parsing intersections...")
+    # Ids need not be dense, so rows of coords without a vertex line hold
+    # garbage: every road endpoint must be a parsed intersection
+    known = np.zeros(num_ids, dtype=bool)
+    known[vertex_ids] = True
+    valid = (edges >= 0) & (edges < num_ids)
+    valid[valid] = known[edges[valid]]
+    if not valid.all():
+        raise ValueError(f"Road endpoint {edges[~valid][0]} is not a known intersection")
     
-    for i in range(1, num_vertices + 1):
-        parts = lines[i].strip().split()
-        vertex_id = int(parts[0])
-        x = int(parts[1])
-        y = int(parts[2])
-        vertices[vertex_id] = (x, y)
+    # Degree per intersection (roads are counted at both endpoints)
+    vertex_degree = np.bincount(edges.ravel(), minlength=len(coords))[vertex_ids]
     
-    # Parse edges (remaining lines)
-    edges = []
-    print("Parsing roads...")
+    # Road lengths; the coordinate table is not needed after this
+    distance = road_distances(coords, edges)
+    del coords
     
-    for i in range(num_vertices + 1, len(lines)):
-        parts = lines[i].strip().split()
-        if len(parts) >= 2:
-            source = int(parts[0])
-            target = int(parts[1])
-            edges.append((source, target))
+    # Write intersections.csv / intersections.parquet
+    print("Writing intersections...")
     
-    print(f"Parsed {len(vertices)} intersections")
-    print(f"Parsed {len(edges)} roads")
+    write_table(pa.table({
+        'id': vertex_ids,
+        'x': vertices[:, 1],
+        'y': vertices[:, 2],
+        'degree': vertex_degree
+    }), INTERSECTIONS_CSV, INTERSECTIONS_PARQUET)
+    
+    # Write roads.csv / roads.parquet with distance
+    print("Writing roads...")
+    
+    write_table(pa.table({
+        'source': edges[:, 0],
+        'target': edges[:, 1],
+        'distance': distance
+    }), ROADS_CSV, ROADS_PARQUET)
     
-    # Write intersections.csv
-    print("Writing intersections.csv...")
+    # Write stats.json with the dashboard's degree aggregates
+    print("Writing stats.json...")
     
-    with open(INTERSECTIONS_CSV, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['id', 'x', 'y'])
-        for vertex_id, (x, y) in vertices.items():
-            writer.writerow([vertex_id, x, y])
+    histogram = np.bincount(vertex_degree)
+    present = np.flatnonzero(histogram)
     
-    # Write roads.csv with distance
-    print("Writing roads.csv...")
+    # Top 10 by degree without sorting every vertex
+    top = top_k_indices(vertex_degree, 10)
     
-    with open(ROADS_CSV, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['source', 'target', 'distance'])
-        for source, target in edges:
-            x1, y1 = vertices[source]
-            x2, y2 = vertices[target]
-            distance = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-            distance = round(distance, 2)
-            writer.writerow([source, target, distance])
+    stats = {
+        'total_intersections': len(vertices),
+        'total_roads': len(edges),
+        'degree_distribution': [
+            {'degree': d, 'count': c}
+            for d, c in zip(present.tolist(), histogram[present].tolist())
+        ],
+        'top10': [
+            {'intersection_id': i, 'degree': d}
+            for i, d in zip(vertex_ids[top].tolist(), vertex_degree[top].tolist())
+        ]
+    }
+    with open(STATS_JSON, 'w') as f:
+        json.dump(stats, f, indent=2)
     
     print("Done!")
     print(f"Files saved:")
     print(f"  - {INTERSECTIONS_CSV}")
     print(f"  - {ROADS_CSV}")
+    print(f"  - {INTERSECTIONS_PARQUET}")
+    print(f"  - {ROADS_PARQUET}")
+    print(f"  - {STATS_JSON}")
 
 if __name__ == "__main__":
-    parse_data()
\ No newline at end of file
+    parse_data()